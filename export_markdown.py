@@ -1,10 +1,32 @@
+import argparse
+import asyncio
+import logging
+
+from src.browser_pool import close_browser, get_browser
 from src.url_discovery import get_article_urls
 from src.markdown_exporter import export_markdown
 
 
+async def run(force_refresh=False):
+    # Discovery and the export share one browser
+    browser = await get_browser()
+    try:
+        sections = await get_article_urls(browser, force_refresh=force_refresh)
+        return await export_markdown(sections, browser=browser)
+    finally:
+        await close_browser()
+
+
 def main():
-    sections = get_article_urls()
-    out_dir = export_markdown(sections)
+    parser = argparse.ArgumentParser(description="Export Apple's Human Interface Guidelines as Markdown.")
+    parser.add_argument("--force-refresh", action="store_true",
+                        help="ignore the cached article list and rediscover all URLs")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only log URL discovery warnings and errors")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+
+    out_dir = asyncio.run(run(force_refresh=args.force_refresh))
     print(f"\n✅ Markdown export complete at: {out_dir}")
 
 
@@ -1,19 +1,32 @@
+import argparse
+import asyncio
+import logging
+
+from src.browser_pool import close_browser, get_browser
 from src.url_discovery import get_article_urls
-from src.pdf_generator import generate_pdfs
+from src.pdf_generator import PdfGenConfig, generate_pdfs
 from src.pdf_merger import merge_pdfs
 
-def main():
-    # This now returns a hierarchical structure of sections
-    sections = get_article_urls()
-    print(f"Found {sum(len(s.get('articles', [])) + sum(len(ss.get('articles', [])) for ss in s.get('sub_sections', [])) for s in sections)} articles across {len(sections)} sections")
-    
-    print("\nStarting PDF generation for all articles...")
-    # generate_pdfs now takes the sections object and returns more structured data
-    output_folder, sections_data, generated_files_map, cover_file, index_file = generate_pdfs(sections)
+async def main(force_refresh=False, accurate_pagination=False):
+    # One browser is shared by URL discovery and PDF generation, so images stay
+    # enabled here; discovery blocks them per context instead
+    browser = await get_browser()
+    try:
+        # This now returns a hierarchical structure of sections
+        sections = await get_article_urls(browser, force_refresh=force_refresh)
+        print(f"Found {sum(len(s.get('articles', [])) + sum(len(ss.get('articles', [])) for ss in s.get('sub_sections', [])) for s in sections)} articles across {len(sections)} sections")
+        
+        print("\nStarting PDF generation for all articles...")
+        # generate_pdfs now takes the sections object and returns more structured data
+        output_folder, sections_data, generated_files_map, cover, index = await generate_pdfs(
+            sections, browser, PdfGenConfig(accurate_pagination=accurate_pagination)
+        )
+    finally:
+        await close_browser()
     
     print("\nStarting PDF merge process...")
     # merge_pdfs is updated to handle the new data structure and create nested bookmarks
-    final_pdf = merge_pdfs(output_folder, sections_data, generated_files_map, cover_file, index_file)
+    final_pdf = merge_pdfs(output_folder, sections_data, generated_files_map, cover, index)
     
     if final_pdf:
         print(f'\n✅ Successfully generated and merged PDFs into: {final_pdf}')
@@ -21,4 +34,13 @@ def main():
         print('\n❌ Failed to merge PDFs')
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Compile Apple's Human Interface Guidelines into a single PDF.")
+    parser.add_argument("--force-refresh", action="store_true",
+                        help="ignore the cached article list and rediscover all URLs")
+    parser.add_argument("--accurate-pagination", action="store_true",
+                        help="lay out page breaks with the slower DOM script instead of print CSS")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only log URL discovery warnings and errors")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+    asyncio.run(main(force_refresh=args.force_refresh, accurate_pagination=args.accurate_pagination))
@@ -0,0 +1,43 @@
+import asyncio
+
+from playwright.async_api import async_playwright
+
+# Chromium flags for headless runs: no GPU, no /dev/shm size limit, and no
+# throttling of timers in pages that are not in the foreground
+LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+]
+
+_playwright = None
+_browser = None
+_lock = asyncio.Lock()
+
+
+async def get_browser():
+    """Return the process-wide Chromium browser, launching it on first use.
+
+    Exporters open their own contexts on it and close only those; the browser
+    itself is shut down once with close_browser().
+    """
+    global _playwright, _browser
+    async with _lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        return _browser
+
+
+async def close_browser():
+    """Close the shared browser and stop its Playwright driver, if running."""
+    global _playwright, _browser
+    async with _lock:
+        if _browser is not None:
+            await _browser.close()
+            _browser = None
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
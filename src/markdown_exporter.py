@@ -1,22 +1,60 @@
+import asyncio
 import os
 import re
+import glob
+import shutil
+import threading
 import json
-import hashlib
+from html import escape
 from datetime import datetime
 from urllib.parse import urlparse, urljoin
 from typing import Optional
 import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor
 
-import requests
+from lxml import html as lxml_html
 
-from playwright.sync_api import sync_playwright
-from markdownify import markdownify as md
+# orjson serializes in native code; the stdlib json module is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# mdka converts in native code without holding the GIL; markdownify is the
+# pure-Python fallback
+try:
+    import mdka
+except ImportError:
+    mdka = None
+    from markdownify import markdownify as md
+
+from src.browser_pool import get_browser
+from src.utils import HTTP_SESSION, fast_hash
+
+# Number of article pages processed at the same time
+CONCURRENCY = 8
+
+# Only the DOM is read from article pages; images are fetched separately and
+# nothing is laid out for display, so these requests are dropped
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media', 'websocket', 'stylesheet', 'manifest'}
+
+
+async def _block_unneeded_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+_SLUG_SEPARATORS = re.compile(r"[\s_]+")
+_SLUG_DISALLOWED = re.compile(r"[^a-z0-9\-]")
+_SLUG_DASH_RUNS = re.compile(r"-+")
 
 
 def slugify(text: str) -> str:
-    text = re.sub(r"[\s_]+", "-", text.strip().lower())
-    text = re.sub(r"[^a-z0-9\-]", "", text)
-    text = re.sub(r"-+", "-", text)
+    text = _SLUG_SEPARATORS.sub("-", text.strip().lower())
+    text = _SLUG_DISALLOWED.sub("", text)
+    text = _SLUG_DASH_RUNS.sub("-", text)
     return text.strip("-") or "untitled"
 
 
@@ -25,10 +63,19 @@ def ensure_dir(path: str):
 
 
 def hash_text(text: str) -> str:
-    return hashlib.md5(text.encode("utf-8")).hexdigest()
+    return fast_hash(text)
+
+
+def to_json(value, indent: bool = False) -> str:
+    """Serialize ``value`` as JSON text, keeping non-ASCII characters as-is."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    return json.dumps(value, indent=2 if indent else None, ensure_ascii=False)
 
 
 def html_to_markdown(html: str) -> str:
+    if mdka is not None:
+        return mdka.html_to_markdown(html)
     # Convert HTML to Markdown with sane defaults for docs
     return md(
         html,
@@ -39,47 +86,57 @@ def html_to_markdown(html: str) -> str:
     )
 
 
-def extract_main_html(page) -> str:
-    """Extract the main content HTML from the page using client-side DOM.
-
-    We prefer the <main> element; fallback to a best-effort content container.
+# Content containers, in order of preference, when there is no <main>
+_MAIN_XPATHS = (
+    '//main', '//*[@id="main"]', '//*[contains(concat(" ", normalize-space(@class), " "), " main ")]',
+    '//*[@id="content"]', '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]',
+    '//article', '//*[@role="main"]',
+    '//div[contains(translate(@aria-label, "CONTENT", "content"), "content")]',
+)
+# Navigation, footers, asides, share widgets and other non-essential UI
+_STRIP_XPATH = (
+    './/nav | .//footer | .//aside | .//script | .//style | .//noscript'
+    ' | .//header//*[contains(concat(" ", normalize-space(@class), " "), " breadcrumbs ")]'
+    ' | .//*[contains(translate(@class, "SHARE", "share"), "share")] | .//*[@data-social]'
+    ' | .//*[contains(translate(@aria-label, "SHARE", "share"), "share")]'
+)
+
+
+def clean_main_html(html: str) -> str:
+    """Return the inner HTML of the page's main content, stripped of page chrome."""
+    if not html.strip():
+        return ""
+    doc = lxml_html.document_fromstring(html)
+    root = None
+    for xpath in _MAIN_XPATHS:
+        found = doc.xpath(xpath)
+        if found:
+            root = found[0]
+            break
+    if root is None:
+        root = doc.body
+    for el in root.xpath(_STRIP_XPATH):
+        if el.getparent() is not None:
+            el.drop_tree()
+    # root.text is unescaped; it goes back into markup, so escape it again
+    inner = [escape(root.text or "", quote=False)]
+    inner.extend(lxml_html.tostring(child, encoding='unicode') for child in root)
+    return "".join(inner)
+
+
+async def extract_main_html(page) -> str:
+    """Extract the main content HTML from the rendered page.
+
+    The DOM is serialized once and cleaned in-process with lxml, off the event
+    loop. We prefer the <main> element; fallback to a best-effort content container.
+    If cleaning fails the whole page HTML is returned; if the page cannot be
+    serialized the error propagates, so the article is reported as failed.
     """
+    html = await page.content()
     try:
-        html = page.evaluate(
-            """
-            () => {
-                const pick = () => {
-                    const main = document.querySelector('main');
-                    if (main) return main.cloneNode(true);
-                    // Fall back to primary content containers
-                    const candidates = [
-                        '#main', '.main', '#content', '.content', 'article',
-                        '[role="main"]', 'div[aria-label*="content" i]'
-                    ];
-                    for (const sel of candidates) {
-                        const el = document.querySelector(sel);
-                        if (el) return el.cloneNode(true);
-                    }
-                    return document.body.cloneNode(true);
-                };
-
-                const root = pick();
-                // Remove navigation, footers, asides, and non-essential UI
-                root.querySelectorAll('nav, footer, aside, header .breadcrumbs, script, style, noscript').forEach(el => el.remove());
-                // Remove share widgets and extraneous controls
-                root.querySelectorAll('[class*="share" i], [data-social], [aria-label*="share" i]').forEach(el => el.remove());
-                // Normalize image lazy attributes
-                root.querySelectorAll('img[loading], img[data-src], img[srcset]').forEach(img => { img.removeAttribute('loading'); img.removeAttribute('srcset'); });
-                return root.innerHTML;
-            }
-            """
-        )
-        return html or ""
+        return await asyncio.to_thread(clean_main_html, html)
     except Exception:
-        try:
-            return page.content()
-        except Exception:
-            return ""
+        return html
 
 
 def write_markdown_file(base_dir: str, section: str, sub_section: Optional[str], title: str, url: str, markdown: str):
@@ -102,7 +159,7 @@ def write_markdown_file(base_dir: str, section: str, sub_section: Optional[str],
         "fetched_at": datetime.utcnow().isoformat() + "Z",
     }
 
-    content = "---\n" + "\n".join(f"{k}: {json.dumps(v)}" for k, v in frontmatter.items()) + "\n---\n\n" + markdown
+    content = "---\n" + "\n".join(f"{k}: {to_json(v)}" for k, v in frontmatter.items()) + "\n---\n\n" + markdown
 
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(content)
@@ -111,12 +168,13 @@ def write_markdown_file(base_dir: str, section: str, sub_section: Optional[str],
 
 
 def create_summary_and_manifest(base_dir: str, manifest_items: list):
-    # Sort manifest by section/sub/title for stable browsing
-    manifest_items.sort(key=lambda x: (x.get("section", ""), x.get("sub_section", ""), x.get("title", "")))
+    # Sort manifest by section/sub/title for stable browsing. Keys are computed
+    # once per item; sub_section is None for articles directly under a section.
+    manifest_items.sort(key=lambda x: (x.get("section") or "", x.get("sub_section") or "", x.get("title") or ""))
 
     # Write manifest.json
     with open(os.path.join(base_dir, "manifest.json"), "w", encoding="utf-8") as f:
-        json.dump(manifest_items, f, indent=2, ensure_ascii=False)
+        f.write(to_json(manifest_items, indent=True))
 
     # Write SUMMARY.md (MkDocs/GitBook style)
     lines = ["# Summary", ""]
@@ -140,44 +198,54 @@ def create_summary_and_manifest(base_dir: str, manifest_items: list):
         f.write("\n".join(lines) + "\n")
 
 
-def export_markdown(sections: list, output_dir: str = "Apple-HIGs-md") -> str:
+async def export_markdown(sections: list, output_dir: str = "Apple-HIGs-md", browser=None) -> str:
     """Export the discovered sections into a hierarchy of Markdown files with frontmatter.
 
-    Returns the root output directory path.
+    Articles are processed on up to CONCURRENCY pages of a single browser
+    context, opened on ``browser`` or else on the shared one from
+    src.browser_pool. Only the context is closed here. Returns the root output
+    directory path.
     """
     ensure_dir(output_dir)
 
     # Flatten unique articles preserving order
     articles = []
+    url_seen = set()
     for section in sections:
         sec_title = section.get("title")
-        for a in section.get("articles", []):
-            articles.append((sec_title, None, a))
+        entries = [(sec_title, None, a) for a in section.get("articles", [])]
         for sub in section.get("sub_sections", []):
-            for a in sub.get("articles", []):
-                articles.append((sec_title, sub.get("title"), a))
+            entries.extend((sec_title, sub.get("title"), a) for a in sub.get("articles", []))
+        for sec, sub, a in entries:
+            url = a.get("url")
+            if url and url not in url_seen:
+                url_seen.add(url)
+                articles.append((sec, sub, a))
 
-    url_seen = set()
     manifest = []
+    # Images are stored once per run, however many articles use them
+    image_cache_dir = os.path.join(output_dir, "_cache")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(viewport={'width': 1200, 'height': 800}, forced_colors='none')
+    async def process_article(context, idx, sec, sub, art):
+        url = art.get("url")
+        title = art.get("title")
 
-        for idx, (sec, sub, art) in enumerate(articles, 1):
+        async with semaphore:
             page = None
-            url = art.get("url")
-            title = art.get("title")
-            if not url or url in url_seen:
-                continue
-            url_seen.add(url)
-
             try:
-                page = context.new_page()
-                page.goto(url, wait_until='networkidle', timeout=60000)
+                page = await context.new_page()
+                await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                # The article is rendered client-side; its heading inside <main>
+                # marks the content extract_main_html reads. Pages without one
+                # still export through clean_main_html's fallbacks.
+                try:
+                    await page.wait_for_selector('main h1', state='attached', timeout=10000)
+                except Exception:
+                    print(f"Warning: Timeout waiting for main heading in {url}")
 
                 # Prefer the main element's HTML
-                html = extract_main_html(page)
+                html = await extract_main_html(page)
+                await page.close()
 
                 # Prepare article directory (where the .md will live) for relative asset paths
                 sec_slug = slugify(sec)
@@ -186,10 +254,12 @@ def export_markdown(sections: list, output_dir: str = "Apple-HIGs-md") -> str:
                 article_dir = os.path.join(output_dir, sec_slug, sub_slug) if sub_slug else os.path.join(output_dir, sec_slug)
                 ensure_dir(article_dir)
 
-                # Download and rewrite image sources for fully offline media
-                html_offline = rewrite_and_cache_images(html, url, article_dir, art_slug)
+                # Download and rewrite image sources for fully offline media; the
+                # downloads block, so they run off the event loop
+                html_offline = await asyncio.to_thread(rewrite_and_cache_images, html, url, article_dir, image_cache_dir)
 
-                markdown = html_to_markdown(html_offline)
+                # Conversion is CPU-bound; with mdka it also runs in parallel
+                markdown = await asyncio.to_thread(html_to_markdown, html_offline)
 
                 # Lightweight de-duplication by content hash
                 content_hash = hash_text(markdown)
@@ -208,13 +278,21 @@ def export_markdown(sections: list, output_dir: str = "Apple-HIGs-md") -> str:
                 print(f"Failed MD export: {url} -> {e}")
             finally:
                 try:
-                    # Only attempt close if page exists and has the method
-                    if page is not None and hasattr(page, 'is_closed') and not page.is_closed():
-                        page.close()
+                    if page is not None and not page.is_closed():
+                        await page.close()
                 except Exception:
                     pass
 
-        browser.close()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    browser = browser or await get_browser()
+    # One context, many pages
+    async with await browser.new_context(viewport={'width': 1200, 'height': 800}, forced_colors='none') as context:
+        await context.route("**/*", _block_unneeded_resources)
+        await asyncio.gather(*(
+            process_article(context, idx, sec, sub, art)
+            for idx, (sec, sub, art) in enumerate(articles, 1)
+        ))
 
     # Create top-level README and indices
     with open(os.path.join(output_dir, "README.md"), "w", encoding="utf-8") as f:
@@ -236,9 +314,22 @@ def export_markdown(sections: list, output_dir: str = "Apple-HIGs-md") -> str:
 
 
 # --- Offline media helpers ---
+# Parallel image downloads per article, over the shared HTTP_SESSION
+IMAGE_WORKERS = 16
+
+# Images already fetched in this process: absolute URL -> Future of the cached
+# file path, so an image shared by many articles is downloaded only once
+_GLOBAL_IMG_CACHE = {}
+_GLOBAL_IMG_LOCK = threading.Lock()
+
+# Path component of an absolute http(s) URL, without query or fragment
+_URL_PATH_RE = re.compile(r'^https?://[^/?#]*([^?#]*)', re.IGNORECASE)
+
+
 def _infer_ext(url: str, content_type: Optional[str]) -> str:
     # Try URL path ext first
-    path = urlparse(url).path
+    m = _URL_PATH_RE.match(url)
+    path = m.group(1) if m else urlparse(url).path
     _, ext = os.path.splitext(path)
     ext = (ext or '').lower()
     if ext in {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.svg', '.tif', '.tiff'}:
@@ -252,10 +343,14 @@ def _infer_ext(url: str, content_type: Optional[str]) -> str:
     return '.png'
 
 
-def _download_image(abs_url: str, out_dir: str, name_seed: str, referer: Optional[str]) -> Optional[str]:
+def _image_cache_key(abs_url: str) -> str:
+    return fast_hash(abs_url)[:16]
+
+
+def _download_image(abs_url: str, out_dir: str, referer: Optional[str]) -> Optional[str]:
     ensure_dir(out_dir)
-    h = hashlib.sha1(f"{name_seed}:{abs_url}".encode('utf-8')).hexdigest()[:16]
-    # Head request to get content-type quickly (fallback to get if head fails)
+    h = _image_cache_key(abs_url)
+    # The extension comes from the GET response's Content-Type; no HEAD round-trip
     headers = {
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Safari',
         'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
@@ -263,49 +358,107 @@ def _download_image(abs_url: str, out_dir: str, name_seed: str, referer: Optiona
     if referer:
         headers['Referer'] = referer
 
+    tmp_path = None
     try:
-        r = requests.get(abs_url, headers=headers, timeout=20, stream=True)
-        r.raise_for_status()
-        ext = _infer_ext(abs_url, r.headers.get('Content-Type'))
-        fname = f"{h}{ext}"
-        fpath = os.path.join(out_dir, fname)
-        with open(fpath, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        with HTTP_SESSION.get(abs_url, headers=headers, timeout=20, stream=True) as r:
+            r.raise_for_status()
+            # Copy the raw stream in large blocks; urllib3 still undoes any
+            # gzip/deflate transfer encoding
+            r.raw.decode_content = True
+            ext = _infer_ext(abs_url, r.headers.get('Content-Type'))
+            fname = f"{h}{ext}"
+            fpath = os.path.join(out_dir, fname)
+            # Write under a temporary name so an interrupted download is never
+            # picked up as a cached image
+            tmp_path = os.path.join(out_dir, f".{fname}.part")
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(r.raw, f, length=1 << 20)
+            os.replace(tmp_path, fpath)
         return fpath
     except Exception:
+        # Do not leave a partial download behind
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
         return None
 
 
-def rewrite_and_cache_images(html: str, page_url: str, article_dir: str, article_slug: str) -> str:
-    """Download images referenced in HTML and rewrite their src to local relative paths."""
-    img_dir = os.path.join(article_dir, "_assets", article_slug)
-    ensure_dir(img_dir)
+def _cached_image(abs_url: str, cache_dir: str, referer: Optional[str]) -> Optional[str]:
+    """Return the cached file for ``abs_url``, downloading it on first use.
 
-    # Find all image sources
-    pattern = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']', re.IGNORECASE)
-    seen = {}
-
-    def repl(match):
-        src = match.group(1)
-        # Skip data URIs (already embedded)
-        if src.startswith('data:'):
-            return match.group(0)
-        # Resolve absolute URL
-        abs_url = urljoin(page_url, src)
-        if abs_url in seen:
-            local_rel = seen[abs_url]
+    Files are named by the URL's hash, so they are also reused from earlier
+    runs into the same output directory. Failed downloads are not cached.
+    """
+    with _GLOBAL_IMG_LOCK:
+        pending = _GLOBAL_IMG_CACHE.get(abs_url)
+        if pending is None:
+            pending = _GLOBAL_IMG_CACHE[abs_url] = Future()
+            owner = True
         else:
-            local_abs = _download_image(abs_url, img_dir, article_slug, referer=page_url)
-            if not local_abs:
-                return match.group(0)  # leave original src
-            local_rel = os.path.relpath(local_abs, start=article_dir)
-            seen[abs_url] = local_rel
-        # Replace only the src attribute value inside the matched tag
-        tag = match.group(0)
-        new_tag = tag.replace(src, local_rel)
-        return new_tag
-
-    new_html = pattern.sub(repl, html)
-    return new_html
+            owner = False
+    if not owner:
+        # Another article is already fetching it
+        return pending.result()
+
+    path = None
+    try:
+        pattern = os.path.join(glob.escape(cache_dir), _image_cache_key(abs_url) + '.*')
+        existing = glob.glob(pattern)
+        path = existing[0] if existing else _download_image(abs_url, cache_dir, referer)
+    except Exception as e:
+        print(f"Warning: Could not cache image {abs_url}: {e}")
+    finally:
+        # Always resolve the Future, or every waiter on this image would block forever
+        if path is None:
+            with _GLOBAL_IMG_LOCK:
+                _GLOBAL_IMG_CACHE.pop(abs_url, None)
+        pending.set_result(path)
+    return path
+
+
+def rewrite_and_cache_images(html: str, page_url: str, article_dir: str, cache_dir: str) -> str:
+    """Download images referenced in HTML and rewrite their src to local relative paths.
+
+    Images live in the shared ``cache_dir``; the rewritten src is relative to
+    ``article_dir``.
+    """
+    if not html.strip():
+        return html
+    # clean_main_html returns a multi-root fragment; parsing it as fragments
+    # avoids the wrapper element fromstring() would add. Leading text comes
+    # back as a plain string.
+    fragments = lxml_html.fragments_fromstring(html)
+    elements = [f for f in fragments if not isinstance(f, str)]
+
+    # Collect the images and their unique absolute URLs first (data URIs are already embedded)
+    images = []
+    for img in (img for el in elements for img in el.iter('img')):
+        # Lazy-loading hints and responsive variants would point back online
+        img.attrib.pop('loading', None)
+        img.attrib.pop('srcset', None)
+        src = img.get('src', '')
+        if src and not src.startswith('data:'):
+            images.append((img, urljoin(page_url, src)))
+    abs_urls = list(dict.fromkeys(abs_url for _, abs_url in images))
+
+    # Fetch them in parallel over the pooled session
+    seen = {}
+    if abs_urls:
+        with ThreadPoolExecutor(max_workers=min(IMAGE_WORKERS, len(abs_urls))) as ex:
+            downloads = ex.map(lambda u: _cached_image(u, cache_dir, referer=page_url), abs_urls)
+            for abs_url, local_abs in zip(abs_urls, downloads):
+                if local_abs:
+                    seen[abs_url] = os.path.relpath(local_abs, start=article_dir)
+
+    for img, abs_url in images:
+        local_rel = seen.get(abs_url)
+        if local_rel:
+            img.set('src', local_rel)
+        # otherwise leave the original src
+
+    return "".join(
+        escape(f, quote=False) if isinstance(f, str) else lxml_html.tostring(f, encoding='unicode')
+        for f in fragments
+    )
@@ -1,11 +1,186 @@
-from playwright.sync_api import sync_playwright
-import urllib.parse
+import asyncio
+import json
 import os
+import re
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
 from src.utils import (
-    sanitize_filename, get_unique_filename, calculate_content_hash,
-    create_index_html, get_pdf_page_count, create_cover_html
+    HTTP_SESSION, calculate_content_hash, create_index_html, docc_data_url,
+    fast_hash, get_pdf_page_count, create_cover_html
 )
 
+# Number of article pages rendered at the same time. page.pdf() is heavy on
+# Chromium's compositor, so this stays near twice the core count.
+CONCURRENCY = max(2, min(8, 2 * (os.cpu_count() or 1)))
+
+# Telemetry hosts that keep the network busy without contributing to the page
+TELEMETRY_HOST_RE = re.compile(r'(metrics|analytics|adobedtm|app-measurement|doubleclick|google-analytics)\.')
+
+# Browser contexts shared by the render workers, and how many pages each one
+# renders before it is closed and replaced to bound its memory growth
+CONTEXT_POOL_SIZE = max(1, min(4, os.cpu_count() or 1))
+MAX_CONTEXT_USES = 25
+
+
+@dataclass
+class PdfGenConfig:
+    """Rendering options for generate_pdfs."""
+    output_dir: str = 'Apple-HIGs'
+    emit_cover: bool = True
+    emit_index: bool = True
+    page_break_script_enabled: bool = True
+    # Run add_page_break_script() on every page instead of the PRINT_CSS rules
+    accurate_pagination: bool = False
+    viewport: dict = field(default_factory=lambda: {'width': 1200, 'height': 800})
+    paper_format: str = 'A4'
+    margins: dict = field(default_factory=lambda: {'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'})
+
+    def pdf_options(self):
+        """Keyword arguments for page.pdf() shared by articles, cover and index."""
+        return {
+            'format': self.paper_format,
+            'print_background': True,
+            'margin': self.margins,
+            'display_header_footer': False
+        }
+
+
+def _preflight_hash(url):
+    """Hash of the DocC JSON behind ``url``, or None if it cannot be fetched.
+
+    The HTML of every article is the same client-side app shell, so the JSON
+    the app renders is what identifies the content. URLs that resolve to the
+    same document hash alike and only need to be rendered once.
+    """
+    try:
+        r = HTTP_SESSION.get(docc_data_url(url), timeout=20)
+        r.raise_for_status()
+    except Exception:
+        return None
+    return fast_hash(r.text)
+
+
+# Headings that open the resources section, matched by the anchor id the site
+# derives from their text
+_RESOURCES_HEADING = ':is(h1, h2, h3, h4, h5, h6):is([id*="resource" i], [id*="related" i], [id*="see-also" i])'
+
+# The first such heading only: "Related" right after "Resources" must not force
+# a second page, whether the earlier heading is a sibling or sits inside an
+# earlier sibling
+_FIRST_RESOURCES_HEADING = (
+    f"{_RESOURCES_HEADING}:not({_RESOURCES_HEADING} ~ {_RESOURCES_HEADING}, "
+    f"{_RESOURCES_HEADING} ~ * {_RESOURCES_HEADING}, "
+    f":has({_RESOURCES_HEADING}) ~ {_RESOURCES_HEADING}, "
+    f":has({_RESOURCES_HEADING}) ~ * {_RESOURCES_HEADING})"
+)
+
+# Print rules that keep figures whole and start the resources section on a new
+# page. They approximate add_page_break_script() without touching the DOM,
+# which likewise breaks only before the first matching heading.
+PRINT_CSS = """
+img, svg, [role="img"], figure, .graphics-container, [class*="figure"], [class*="image"] {
+    break-inside: avoid;
+    page-break-inside: avoid;
+}
+""" + _FIRST_RESOURCES_HEADING + """ {
+    break-before: page;
+    page-break-before: always;
+}
+"""
+
+
+async def _block_telemetry(route):
+    # Match on the host only, so first-party assets such as "analytics.png" still load
+    if TELEMETRY_HOST_RE.search(urlsplit(route.request.url).netloc):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _prepare_context(context, config):
+    await context.route("**/*", _block_telemetry)
+    if not config.page_break_script_enabled:
+        return
+    if config.accurate_pagination:
+        # Ship the pagination script once per context; pages only call it. It is
+        # not run at DOMContentLoaded because the article is rendered client-side
+        # after that, so it is invoked once the content is present.
+        await context.add_init_script(f"window.__applyPageBreaks = () => {{ {add_page_break_script()} }};")
+    else:
+        # A stylesheet also applies to content rendered after it is inserted
+        await context.add_init_script(
+            "document.addEventListener('DOMContentLoaded', () => {"
+            " const style = document.createElement('style');"
+            f" style.textContent = {json.dumps(PRINT_CSS)};"
+            " document.head.appendChild(style); });"
+        )
+
+
+class ContextPool:
+    """A small pool of browser contexts shared by concurrent pages.
+
+    Pages are opened on the least recently used context. Once a context has
+    served ``max_uses`` pages it takes no new ones and is closed as soon as its
+    last page is done; a fresh context replaces it on demand.
+    """
+
+    def __init__(self, browser, size, max_uses=MAX_CONTEXT_USES, setup=None, **context_options):
+        self._browser = browser
+        self._size = size
+        self._max_uses = max_uses
+        self._setup = setup
+        self._context_options = context_options
+        self._contexts = deque()  # live contexts, least recently used first
+        self._uses = {}  # context -> pages opened so far
+        self._open_pages = {}  # context -> pages currently open
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Serialized so that concurrent callers never create more than `size` contexts
+        async with self._lock:
+            if len(self._contexts) < self._size:
+                context = await self._browser.new_context(**self._context_options)
+                if self._setup:
+                    await self._setup(context)
+                self._uses[context] = 0
+                self._open_pages[context] = 0
+            else:
+                context = self._contexts.popleft()
+            self._uses[context] += 1
+            self._open_pages[context] += 1
+            if self._uses[context] < self._max_uses:
+                self._contexts.append(context)
+            return context
+
+    async def release(self, context):
+        self._open_pages[context] -= 1
+        if self._uses[context] >= self._max_uses and self._open_pages[context] == 0:
+            del self._uses[context], self._open_pages[context]
+            await context.close()
+
+    @asynccontextmanager
+    async def page(self):
+        context = await self.acquire()
+        try:
+            page = await context.new_page()
+            try:
+                yield page
+            finally:
+                if not page.is_closed():
+                    await page.close()
+        finally:
+            await self.release(context)
+
+    async def close(self):
+        contexts = list(self._uses)
+        self._contexts.clear()
+        self._uses.clear()
+        self._open_pages.clear()
+        for context in contexts:
+            await context.close()
+
 def add_page_break_script():
     """JavaScript to handle image pagination and section breaks"""
     return """
@@ -46,13 +221,10 @@ def add_page_break_script():
 
         // Handle Resources and Change Log sections
         function handleSpecialSections() {
-            const headings = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6'));
-            
-            const resourcesHeading = headings.find(h => 
-                h.textContent.toLowerCase().includes('resource') ||
-                h.textContent.toLowerCase().includes('related') ||
-                h.textContent.toLowerCase().includes('see also')
-            );
+            // One case-insensitive test per heading instead of repeated lowercasing
+            const specialHeadingRe = /resource|related|see also/i;
+            const resourcesHeading = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6'))
+                .find(h => specialHeadingRe.test(h.textContent));
 
             if (resourcesHeading) {
                 // Create resources wrapper with page break
@@ -88,102 +260,164 @@ def add_page_break_script():
         handleSpecialSections();
     """
 
-def generate_pdfs(sections):
-    """Generate PDFs for all articles, based on the hierarchical section data."""
-    output_dir = 'Apple-HIGs'
+async def generate_pdfs(sections, browser, config=None):
+    """Generate PDFs for all articles, based on the hierarchical section data.
+
+    Articles are rendered concurrently on up to CONCURRENCY pages spread over a
+    small pool of contexts, so network and render latencies overlap. The
+    ``browser`` is owned by the caller, which keeps a single Playwright driver
+    alive for the whole run. ``config`` defaults to ``PdfGenConfig()``; a
+    disabled cover or index is returned as ``(None, 0)``.
+    """
+    config = config or PdfGenConfig()
+    output_dir = config.output_dir
     os.makedirs(output_dir, exist_ok=True)
+    pdf_options = config.pdf_options()
     
     all_articles = []
-    # Flatten the sections structure to a list of articles for processing (preserve given order)
+    queued_urls = set()
+    # Flatten the sections structure to a list of unique articles for processing (preserve given order).
+    # An article listed under several sections is rendered once; the map is keyed by URL.
     for section in sections:
-        for a in section.get("articles", []):
-            all_articles.append(a)
+        articles = list(section.get("articles", []))
         for sub_section in section.get("sub_sections", []):
-            for a in sub_section.get("articles", []):
+            articles.extend(sub_section.get("articles", []))
+        for a in articles:
+            if a["url"] not in queued_urls:
+                queued_urls.add(a["url"])
                 all_articles.append(a)
 
-    generated_files_map = {}  # url -> (filepath, page_count)
-    hash_to_file = {}  # content_hash -> (filepath, page_count)
+    generated_files_map = {}  # url -> (pdf_bytes, page_count)
+    # Content hash, or "docc:" + pre-flight hash -> Future of (pdf_bytes,
+    # page_count), or None if rendering failed. Registered before rendering
+    # starts, so a duplicate that shows up while the first copy is still
+    # rendering waits for it instead.
+    renders = {}
+    # Rendered PDFs are handed from the render workers to a single consumer,
+    # so no intermediate files are written
+    rendered = asyncio.Queue()
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        context = browser.new_context(
-            viewport={'width': 1200, 'height': 800},
-            forced_colors='none'
-        )
-        
-        # Generate PDFs for all unique articles
-        for idx, article in enumerate(all_articles, 1):
+    async def collect_rendered():
+        while True:
+            item = await rendered.get()
+            if item is None:
+                break
+            idx, url, title, pdf_bytes, page_count = item
+            generated_files_map[url] = (pdf_bytes, page_count)
+            print(f'Generated ({idx}/{len(all_articles)}): {title} - {page_count} pages')
+    
+    pool = ContextPool(
+        browser, CONTEXT_POOL_SIZE,
+        setup=lambda context: _prepare_context(context, config),
+        viewport=config.viewport,
+        forced_colors='none'
+    )
+    try:
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def render_article(idx, article):
             url = article["url"]
             title = article["title"]
-            
+            pending = None  # render of identical content to reuse
+            own = None  # render this worker is responsible for
+            own_doc = None  # Future for this article's DocC document, if claimed here
+
+            # Pre-flight over plain HTTP before taking a render slot: an alias
+            # of a document already claimed waits for that render instead of
+            # loading a page. A failed pre-flight just renders the article.
+            doc_hash = await asyncio.to_thread(_preflight_hash, url)
+            doc_key = f"docc:{doc_hash}" if doc_hash else None
+            result = None
             try:
-                page = context.new_page()
-                page.goto(url, wait_until='networkidle', timeout=60000)
-                
-                content_hash = calculate_content_hash(page)
-                if content_hash in hash_to_file:
-                    # Duplicate content: reuse existing file and page count
-                    existing_file, page_count = hash_to_file[content_hash]
-                    generated_files_map[url] = (existing_file, page_count)
-                    print(f"Skipping duplicate content (reused): {url}")
-                    continue
-                
-                try:
-                    page.evaluate(add_page_break_script())
-                except Exception as e:
-                    print(f"Warning: Could not apply image pagination for {url}: {str(e)}")
-                
-                try:
-                    page.wait_for_selector('img', state='attached', timeout=15000)
-                except:
-                    print(f"Warning: No images found or timeout waiting for images in {url}")
-                
-                path_parts = [p for p in urllib.parse.urlparse(url).path.split('/') if p]
-                # Build a descriptive but safe filename using last 2 segments to reduce collisions
-                tail = "-".join(path_parts[-2:]) if len(path_parts) >= 2 else (path_parts[-1] if path_parts else 'article')
-                safe_title = sanitize_filename(f"human-interface-guidelines-{tail}-{title}")
-                filepath = get_unique_filename(output_dir, f"{safe_title}.pdf")
-                
-                pdf_options = {
-                    'path': filepath,
-                    'format': 'A4',
-                    'print_background': True,
-                    'margin': {'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'},
-                    'display_header_footer': False
-                }
-                
-                page.pdf(**pdf_options)
-                
-                page_count = get_pdf_page_count(filepath)
-                generated_files_map[url] = (filepath, page_count)
-                hash_to_file[content_hash] = (filepath, page_count)
-                print(f'Generated ({idx}/{len(all_articles)}): {os.path.basename(filepath)} - {page_count} pages')
-                
-            except Exception as e:
-                print(f'Failed {url}: {str(e)}')
+                if doc_key in renders:
+                    pending = renders[doc_key]
+                else:
+                    if doc_key:
+                        own_doc = renders[doc_key] = asyncio.get_running_loop().create_future()
+                    async with semaphore:
+                        try:
+                            async with pool.page() as page:
+                                await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                                # Best-effort: an article without a heading still renders
+                                try:
+                                    await page.wait_for_selector('h1', timeout=10000)
+                                except Exception:
+                                    print(f"Warning: Timeout waiting for heading in {url}")
+                        
+                                content_hash = await calculate_content_hash(page)
+                                if content_hash in renders:
+                                    # Duplicate content: reuse that PDF and page count once it is ready
+                                    pending = renders[content_hash]
+                                else:
+                                    own = renders[content_hash] = asyncio.get_running_loop().create_future()
+                            
+                                    if config.page_break_script_enabled and config.accurate_pagination:
+                                        try:
+                                            await page.evaluate("window.__applyPageBreaks()")
+                                        except Exception as e:
+                                            print(f"Warning: Could not apply image pagination for {url}: {str(e)}")
+                            
+                                    try:
+                                        await page.wait_for_function("Array.from(document.images).every(img => img.complete)", timeout=5000)
+                                    except Exception:
+                                        print(f"Warning: Timeout waiting for images in {url}")
+                            
+                                    pdf_bytes = await page.pdf(**pdf_options)
+                            if own is not None:
+                                # Count pages on a worker thread so concurrent articles are
+                                # parsed in parallel without blocking the event loop
+                                page_count = await asyncio.to_thread(get_pdf_page_count, pdf_bytes)
+                                own.set_result((pdf_bytes, page_count))
+                                await rendered.put((idx, url, title, pdf_bytes, page_count))
+                    
+                        except Exception as e:
+                            print(f'Failed {url}: {str(e)}')
+                        finally:
+                            if own is not None and not own.done():
+                                own.set_result(None)
+
+                # Waited for outside the semaphore so the slot goes to another article
+                if pending is not None:
+                    result = await pending
+                    if result is None:
+                        print(f'Failed {url}: duplicate of content that failed to render')
+                    else:
+                        generated_files_map[url] = result
+                        print(f"Skipping duplicate content (reused): {url}")
+                elif own is not None:
+                    result = own.result()
             finally:
-                if 'page' in locals() and not page.is_closed():
-                    page.close()
-        
-        # --- Create Cover and Index ---
-        # Generate cover page
-        cover_page = context.new_page()
-        cover_html = create_cover_html()
-        cover_page.set_content(cover_html)
-        cover_file = os.path.join(output_dir, "_cover.pdf")
-        cover_page.pdf(path=cover_file, format='A4', print_background=True, margin={'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'})
-        cover_page.close()
-        cover_page_count = get_pdf_page_count(cover_file)
-
-        # Create index
-        index_html, sections_info_for_index = create_index_html(sections, generated_files_map, cover_page_count)
-        index_file = os.path.join(output_dir, "_index.pdf")
-        index_page = context.new_page()
-        index_page.set_content(index_html)
-        index_page.pdf(path=index_file, format='A4', print_background=True, margin={'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'})
-        index_page.close()
-        
-        browser.close()
+                if own_doc is not None:
+                    own_doc.set_result(result)
+
+        async def render_cover():
+            # The cover is static, so it is rendered alongside the articles
+            if not config.emit_cover:
+                return (None, 0)
+            async with pool.page() as cover_page:
+                await cover_page.set_content(create_cover_html())
+                cover_pdf = await cover_page.pdf(**pdf_options)
+            # Counted off the event loop, like the articles it renders alongside
+            return (cover_pdf, await asyncio.to_thread(get_pdf_page_count, cover_pdf))
+
+        # Generate the cover and PDFs for all unique articles
+        consumer = asyncio.create_task(collect_rendered())
+        cover_task = asyncio.create_task(render_cover())
+        await asyncio.gather(*(render_article(idx, article) for idx, article in enumerate(all_articles, 1)))
+        await rendered.put(None)
+        await consumer
+
+        cover = await cover_task
+
+        # Create index; it needs every article's page count, so it is rendered last
+        index = (None, 0)
+        if config.emit_index:
+            index_html, sections_info_for_index = create_index_html(sections, generated_files_map, cover[1])
+            async with pool.page() as index_page:
+                await index_page.set_content(index_html)
+                index_pdf = await index_page.pdf(**pdf_options)
+            index = (index_pdf, get_pdf_page_count(index_pdf))
         
-        return (output_dir, sections, generated_files_map, cover_file, index_file)
+        return (output_dir, sections, generated_files_map, cover, index)
+    finally:
+        await pool.close()
@@ -1,101 +1,94 @@
-from PyPDF2 import PdfMerger, PdfReader
+import io
 import os
 
+import pikepdf
+from pikepdf import OutlineItem
 
-def merge_pdfs(output_dir, sections, generated_files_map, cover_file, index_file):
-    """Merge PDFs with nested bookmarks, preserving the discovered hierarchy order."""
+
+def merge_pdfs(output_dir, sections, generated_files_map, cover, index):
+    """Merge PDFs with nested bookmarks, preserving the discovered hierarchy order.
+
+    ``cover``, ``index`` and the values of ``generated_files_map`` are
+    ``(pdf_bytes, page_count)`` pairs; the page counts recorded at render time
+    are used as-is. Only the merged document is written to disk. Page trees
+    are spliced with pikepdf (qpdf), so the merge cost is dominated by I/O
+    rather than Python object handling.
+    """
     merged_output = "Apple HIGs Complete.pdf"
 
     if not generated_files_map:
         print("No PDFs found to merge.")
         return None
 
+    # Source documents must stay open until the merged file has been saved
+    sources = []
+
+    def open_pdf(pdf_bytes):
+        pdf = pikepdf.Pdf.open(io.BytesIO(pdf_bytes))
+        sources.append(pdf)
+        return pdf
+
     try:
-        merger = PdfMerger()
+        merged = pikepdf.Pdf.new()
 
         # 1. Add Cover
-        cover_pages = 0
-        if os.path.exists(cover_file):
-            merger.append(cover_file)
-            cover_pages = get_pdf_page_count(cover_file)
+        cover_pdf, cover_pages = cover
+        if cover_pdf:
+            merged.pages.extend(open_pdf(cover_pdf).pages)
 
         # 2. Add Index
-        index_pages = 0
-        if os.path.exists(index_file):
-            merger.append(index_file)
-            index_pages = get_pdf_page_count(index_file)
-
-        # 3. Append content PDFs in the order provided by sections
-        files_to_append = []
-        for section in sections:
-            for article in section.get("articles", []):
-                filepath, _ = generated_files_map.get(article["url"], (None, None))
-                if filepath and os.path.exists(filepath):
-                    files_to_append.append(filepath)
-            for sub_section in section.get("sub_sections", []):
-                for article in sub_section.get("articles", []):
-                    filepath, _ = generated_files_map.get(article["url"], (None, None))
-                    if filepath and os.path.exists(filepath):
-                        files_to_append.append(filepath)
-
-        for filepath in files_to_append:
-            print(f"Appending: {os.path.basename(filepath)}")
-            merger.append(filepath)
-
-        # 4. Build the outline (bookmarks)
-        current_page = cover_pages + index_pages  # zero-based index in PyPDF2
+        index_pdf, index_pages = index
+        if index_pdf:
+            merged.pages.extend(open_pdf(index_pdf).pages)
+
+        # 3. Walk the hierarchy once: queue each article's PDF and build its
+        #    bookmark from the page count recorded at render time
+        current_page = cover_pages + index_pages  # zero-based page index
+        outline_items = []
+        pdfs_to_append = []
+
+        def add_articles(articles, parent_item):
+            nonlocal current_page
+            for article in articles:
+                pdf_bytes, page_count = generated_files_map.get(article["url"], (None, 0))
+                if pdf_bytes:
+                    pdfs_to_append.append((article["title"], pdf_bytes))
+                    parent_item.children.append(OutlineItem(article["title"], current_page))
+                    current_page += page_count
 
         for section in sections:
             # Section bookmark points to the first page of the section's first article
-            section_start_page = current_page
-            parent_bookmark = merger.add_outline_item(section["title"], section_start_page)
+            section_item = OutlineItem(section["title"], current_page)
+            outline_items.append(section_item)
 
             # Articles directly under the section
-            for article in section.get("articles", []):
-                filepath, page_count = generated_files_map.get(article["url"], (None, 0))
-                if filepath and os.path.exists(filepath):
-                    merger.add_outline_item(article["title"], current_page, parent=parent_bookmark)
-                    current_page += page_count
+            add_articles(section.get("articles", []), section_item)
 
             # Sub-sections
             for sub_section in section.get("sub_sections", []):
-                sub_parent_bookmark = merger.add_outline_item(sub_section["title"], current_page, parent=parent_bookmark)
-                for article in sub_section.get("articles", []):
-                    filepath, page_count = generated_files_map.get(article["url"], (None, 0))
-                    if filepath and os.path.exists(filepath):
-                        merger.add_outline_item(article["title"], current_page, parent=sub_parent_bookmark)
-                        current_page += page_count
+                sub_item = OutlineItem(sub_section["title"], current_page)
+                section_item.children.append(sub_item)
+                add_articles(sub_section.get("articles", []), sub_item)
+
+        # 4. Append content PDFs in the order provided by sections
+        for title, pdf_bytes in pdfs_to_append:
+            print(f"Appending: {title}")
+            merged.pages.extend(open_pdf(pdf_bytes).pages)
+
+        # 5. Attach the finished outline (bookmarks) tree in a single pass
+        with merged.open_outline() as outline:
+            outline.root.extend(outline_items)
 
         # Write final merged PDF
         merged_path = os.path.join(output_dir, merged_output)
-        merger.write(merged_path)
-        merger.close()
-
-        # Clean up individual PDFs
-        try:
-            if os.path.exists(cover_file):
-                os.remove(cover_file)
-            if os.path.exists(index_file):
-                os.remove(index_file)
-            for filepath, _ in generated_files_map.values():
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-        except Exception:
-            # Non-critical cleanup errors can be ignored
-            pass
+        merged.save(merged_path)
+        merged.close()
 
         return merged_path
 
     except Exception as e:
         print(f"Error during PDF merge: {str(e)}")
         return None
-
-def get_pdf_page_count(pdf_path):
-    """Helper to get page count, needed for bookmark logic."""
-    from PyPDF2 import PdfReader
-    try:
-        with open(pdf_path, 'rb') as f:
-            reader = PdfReader(f)
-            return len(reader.pages)
-    except Exception:
-        return 0
+    finally:
+        for pdf in sources:
+            pdf.close()
@@ -1,8 +1,179 @@
-from playwright.sync_api import sync_playwright, Page
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+import requests
+from playwright.async_api import async_playwright
 from urllib.parse import urljoin
 
+from src.browser_pool import LAUNCH_ARGS
+from src.utils import docc_data_url
+
+logger = logging.getLogger(__name__)
+
+START_URL = "https://developer.apple.com/design/human-interface-guidelines/"
+
+# Discovered sections are cached per revision of the HIG landing page
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "higs")
+# Section detected from each article page that had to be loaded; kept across
+# landing page revisions, since articles rarely move between sections
+CLASSIFICATION_CACHE_PATH = os.path.join(CACHE_DIR, "classifications.json")
+
+# Resource types discovery never needs. Stylesheets stay enabled: the
+# virtualized navigator relies on layout to decide which rows to render.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# A browser launched for discovery alone never needs to decode images
+DISCOVERY_LAUNCH_ARGS = LAUNCH_ARGS + ["--blink-settings=imagesEnabled=false"]
+
+# Navigation budget for every page of the discovery context; only the landing
+# page, which loads the whole navigator, passes a longer one
+NAVIGATION_TIMEOUT_MS = 30000
+
+# Reads every HIG link under a root element in one round-trip, with the label
+# from the first element matching the given selector (or the link itself)
+LINKS_JS = """
+(root, labelSelector) => Array.from(
+    root.querySelectorAll('a[href^="/design/human-interface-guidelines/"]')
+).map(a => {
+    const label = a.querySelector(labelSelector) || a;
+    return {href: a.getAttribute('href'), title: (label.innerText || '').trim()};
+})
+"""
+
+# Installs window.__higNav on the navigator element once, so each crawl step
+# sends a short call instead of its function source: reset() scrolls to an
+# edge, expand() clicks collapsed toggles, step() reads the rendered links and
+# scrolls most of a viewport on (so consecutive windows overlap) unless at the edge
+NAV_HELPERS_JS = """
+(el) => {
+    const readLinks = %s;
+    window.__higNav = {
+        reset: (down) => el.scrollTo(0, down ? 0 : el.scrollHeight),
+        expand: () => {
+            const t = el.querySelectorAll('[aria-expanded="false"]');
+            t.forEach(b => b.click());
+            return t.length;
+        },
+        step: (down) => {
+            const links = readLinks(el, 'p.highlight');
+            const atEdge = down
+                ? el.scrollTop >= el.scrollHeight - el.clientHeight - 1
+                : el.scrollTop <= 1;
+            if (!atEdge) {
+                const d = Math.max(200, Math.floor(el.clientHeight * 0.9));
+                el.scrollBy(0, down ? d : -d);
+            }
+            return {links, atEdge};
+        },
+    };
+}
+""" % LINKS_JS.strip()
+
+# Number of HIG links currently in the DOM; lazy sections are done loading once
+# it stops growing
+HIG_LINK_COUNT_JS = (
+    "() => document.querySelectorAll('a[href^=\"/design/human-interface-guidelines/\"]').length"
+)
+
+# Article pages loaded at the same time to classify them, and the delay between
+# the first requests so they do not reach the site as a single burst
+CLASSIFY_CONCURRENCY = 12
+CLASSIFY_STAGGER_S = 0.1
+
+
+HIG_PATH_PREFIX = "/design/human-interface-guidelines/"
+
+
+@lru_cache(maxsize=8192)
+def _normalize_href(href: str) -> Optional[str]:
+    """Canonical site path of an HIG link, or None for links elsewhere.
+
+    The query, fragment, trailing slash and any repeated
+    "human-interface-guidelines" segment are dropped, so variants of one page
+    are seen, and classified, once. The virtualized navigator re-renders
+    overlapping windows of the same anchors, so the same hrefs are normalized
+    over and over.
+    """
+    if href.startswith("https://developer.apple.com"):
+        href = href[len("https://developer.apple.com"):]
+    elif href.startswith("http"):
+        return None
+    if not href.startswith(HIG_PATH_PREFIX):
+        return None
+    rest = href[len(HIG_PATH_PREFIX):].split("#", 1)[0].split("?", 1)[0]
+    while rest.startswith("human-interface-guidelines/") or rest == "human-interface-guidelines":
+        rest = rest[len("human-interface-guidelines/"):]
+    return (HIG_PATH_PREFIX + rest).rstrip("/")
+
+
+# Section, sub-section and leaf slugs of an HIG path, in one scan; repeated
+# "human-interface-guidelines" segments are skipped by the non-capturing group
+_PATH_RE = re.compile(
+    r"^/design/human-interface-guidelines/(?:human-interface-guidelines/)*"
+    r"([^/#]+)(?:/([^/#]+))?(?:/([^/#]+))?(?:/|$)"
+)
+
+
+@lru_cache(maxsize=8192)
+def _path_slugs(path: str) -> Optional[tuple]:
+    """(section, sub, leaf) slugs of an HIG path, None where absent.
+
+    Returns None for paths outside the HIG or for the HIG root itself.
+    """
+    m = _PATH_RE.match(path)
+    return m.groups() if m else None
+
+
+async def _block_unneeded_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
 
-def get_article_urls():
+
+def _index_cache_path():
+    """Return the cache file for the current revision of the HIG landing page.
+
+    The revision is identified by the ETag/Last-Modified response headers. If the
+    server sends neither (or cannot be reached) there is nothing safe to key the
+    cache on and None is returned.
+    """
+    try:
+        r = requests.head(START_URL, allow_redirects=True, timeout=10)
+        r.raise_for_status()
+    except requests.RequestException:
+        return None
+    validator = r.headers.get("ETag", "") + r.headers.get("Last-Modified", "")
+    if not validator:
+        return None
+    key = hashlib.sha1(validator.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"index-{key}.json")
+
+
+def _load_classifications():
+    try:
+        with open(CLASSIFICATION_CACHE_PATH, "r", encoding="utf-8") as f:
+            return {url: tuple(top_sub) for url, top_sub in json.load(f).items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+def _save_classifications(classifications):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(CLASSIFICATION_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(classifications, f, ensure_ascii=False)
+    except OSError as e:
+        logger.warning(f"Could not write classification cache: {str(e)}")
+
+
+async def get_article_urls(browser=None, force_refresh=False):
     """
     Discover all HIG article URLs by fully expanding and scrolling the virtualized
     navigation, then organize them to mirror the site's hierarchy and order.
@@ -12,8 +183,45 @@ def get_article_urls():
       articles: List[{title, url}],
       sub_sections: List[{title, articles: List[{title, url}]}]
     }]
+
+    Results are cached on disk for as long as the landing page is unchanged;
+    ``force_refresh`` ignores the caches. Pass an already launched ``browser``
+    to reuse it; otherwise one is launched if discovery has to run.
     """
-    start_url = "https://developer.apple.com/design/human-interface-guidelines/"
+    cache_path = _index_cache_path()
+    if cache_path and not force_refresh and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                sections = json.load(f)
+            logger.info(f"Loaded {len(sections)} sections from discovery cache: {cache_path}")
+            return sections
+        except (OSError, ValueError):
+            pass
+
+    if browser is None:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=DISCOVERY_LAUNCH_ARGS)
+            try:
+                sections = await _discover_article_urls(browser, force_refresh)
+            finally:
+                await browser.close()
+    else:
+        sections = await _discover_article_urls(browser, force_refresh)
+
+    if cache_path and sections:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(sections, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Could not write discovery cache: {str(e)}")
+
+    return sections
+
+
+async def _discover_article_urls(browser, force_refresh=False):
+    """Run the Playwright discovery behind get_article_urls on ``browser``."""
+    start_url = START_URL
     base_url = "https://developer.apple.com"
 
     # Desired top-level order as shown in the site's Topics section
@@ -59,8 +267,8 @@ def get_article_urls():
     }
 
     sections_map = {}
-    discovered_links = []  # preserve DOM order
-    seen_hrefs = set()
+    # Canonical href -> link, first sighting wins; insertion order is DOM order
+    discovered_links: dict[str, dict] = {}
 
     def ensure_section(name: str):
         if name not in sections_map:
@@ -77,170 +285,151 @@ def get_article_urls():
             section["_sub_map"][sub_name] = []
         section["_sub_map"][sub_name].append({"title": title, "url": url})
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    # JavaScript has to stay enabled: the navigator and section pages are
+    # rendered client-side. Service workers are only overhead for a one-off crawl.
+    async with await browser.new_context(service_workers="block") as context:
+        await context.route("**/*", _block_unneeded_resources)
+        # Applies to every page opened on the context, including the section
+        # and classification pages
+        context.set_default_navigation_timeout(NAVIGATION_TIMEOUT_MS)
+        page = await context.new_page()
 
         try:
-            print(f"Loading main navigation page: {start_url}")
-            page.goto(start_url, wait_until="networkidle", timeout=90000)
+            logger.info(f"Loading main navigation page: {start_url}")
+            await page.goto(start_url, wait_until="domcontentloaded", timeout=60000)
+            await page.wait_for_selector("h1", timeout=20000)
 
-            if "Human Interface Guidelines" not in page.title():
+            if "Human Interface Guidelines" not in await page.title():
                 raise Exception("Failed to load HIG main page")
 
             # Try to locate navigation sidebar; not fatal if not present or fails
             navigator = None
             try:
-                navigator = page.wait_for_selector("nav.navigator", state="visible", timeout=20000)
+                navigator = await page.wait_for_selector("nav.navigator", state="visible", timeout=20000)
             except Exception:
                 navigator = None
 
             # Helper: scroll through the virtualized navigator and expand all toggles
-            def crawl_nav():
-                nonlocal discovered_links, seen_hrefs
-
-                # Function runs a full top->bottom pass while expanding as it goes
-                def run_pass(direction: str = "down"):
-                    # Reset to edge
-                    if direction == "down":
-                        navigator.evaluate("(el) => { el.scrollTo(0, 0); }")
-                    else:
-                        # Go to bottom first for the upward pass
-                        navigator.evaluate("(el) => { el.scrollTo(0, el.scrollHeight); }")
+            async def crawl_nav():
+                await navigator.evaluate(NAV_HELPERS_JS)
+
+                # Function runs a full top->bottom pass while expanding as it goes.
+                # Returns True if its last step still expanded or found something.
+                async def run_pass(direction: str = "down"):
+                    down = direction == "down"
+                    # Reset to edge; the upward pass starts from the bottom
+                    await page.evaluate("(down) => __higNav.reset(down)", down)
 
                     last_count = len(discovered_links)
                     stable_steps = 0
+                    changed = False
                     for _ in range(400):  # generous upper bound
-                        # Expand visible toggles
-                        toggles = navigator.query_selector_all('[aria-expanded="false"]')
-                        for btn in toggles or []:
-                            try:
-                                btn.click()
-                                page.wait_for_timeout(60)
-                            except Exception:
-                                pass
-
-                        # Collect currently rendered links in order
-                        links = navigator.query_selector_all('a[href^="/design/human-interface-guidelines/"]') or []
-                        for link in links:
-                            href = link.get_attribute("href")
-                            if not href:
-                                continue
+                        # Expand all visible toggles in one round-trip, then let the
+                        # navigator render the revealed rows
+                        expanded = await page.evaluate("__higNav.expand()")
+                        changed = expanded > 0
+                        if changed:
+                            await page.wait_for_timeout(150)
+
+                        # Collect currently rendered links in order, preferring the
+                        # visible label text within each link, and scroll one step
+                        result = await page.evaluate("(down) => __higNav.step(down)", down)
+                        for link in result["links"]:
                             # Normalize to site-internal path
-                            if href.startswith("https://developer.apple.com"):
-                                href = href[len("https://developer.apple.com"):]
-                            elif href.startswith("http"):
-                                continue
-                            if not href.startswith("/design/human-interface-guidelines/"):
-                                continue
-                            # Prefer the visible label text within the link
-                            title_el = link.query_selector('p.highlight') or link
-                            try:
-                                title = title_el.inner_text().strip()
-                            except Exception:
-                                title = (href.rstrip("/").split("/")[-1] or "").replace("-", " ").title()
-
-                            if href not in seen_hrefs:
-                                seen_hrefs.add(href)
-                                discovered_links.append({"href": href, "title": title})
-
-                        # Scroll one step
-                        at_edge = navigator.evaluate(
-                            "(el) => { const nearTop = el.scrollTop <= 1; const nearBottom = el.scrollTop >= (el.scrollHeight - el.clientHeight - 1); return {nearTop, nearBottom, top: el.scrollTop, max: el.scrollHeight - el.clientHeight}; }"
-                        )
-
-                        if (direction == "down" and at_edge["nearBottom"]) or (direction == "up" and at_edge["nearTop"]):
-                            stable_steps += 1
-                            if stable_steps >= 3:
-                                break
-                        else:
-                            delta = 400 if direction == "down" else -400
-                            navigator.evaluate("(el, d) => { el.scrollBy(0, d); }", delta)
-                            page.wait_for_timeout(120)
+                            href = _normalize_href(link["href"]) if link["href"] else None
+                            if href and href not in discovered_links:
+                                discovered_links[href] = {"href": href, "title": link["title"]}
 
-                        # If nothing new for a while, early stop
+                        # If nothing new for a while, early stop. Checked before the
+                        # edge test so links found on the final step still count.
                         if len(discovered_links) == last_count:
                             stable_steps += 1
                         else:
                             stable_steps = 0
                             last_count = len(discovered_links)
+                            changed = True
 
-                # Two passes can help reveal nodes that render only after parents expand
-                run_pass("down")
-                run_pass("up")
-                run_pass("down")
+                        if result["atEdge"]:
+                            stable_steps += 1
+                            if stable_steps >= 3:
+                                break
+                        else:
+                            await page.wait_for_timeout(80)
+                    return changed
+
+                # Extra passes only help when the first one was still revealing
+                # nodes at its end, e.g. children of parents expanded last
+                if await run_pass("down"):
+                    await run_pass("up")
+                    await run_pass("down")
 
             if navigator:
-                print("Expanding and scrolling navigation to discover all links...")
-                crawl_nav()
-                print(f"Found {len(discovered_links)} total links in the navigator (unique by href).")
+                logger.info("Expanding and scrolling navigation to discover all links...")
+                await crawl_nav()
+                logger.info(f"Found {len(discovered_links)} total links in the navigator (unique by href).")
             else:
-                print("Navigation sidebar not detected; falling back to section page traversal.")
+                logger.info("Navigation sidebar not detected; falling back to section page traversal.")
 
             # Helper: scroll full page to force-load lazy/virtual content
-            def scroll_full_page():
+            async def scroll_full_page(pg):
                 try:
+                    # Pages that fit in about a viewport and a half are rendered on load
+                    if await pg.evaluate(
+                        "() => document.scrollingElement.scrollHeight <= window.innerHeight * 1.5"
+                    ):
+                        return
+                    # Stop once the HIG link count (what we actually read) stops changing
                     last = -1
                     same_count = 0
                     for _ in range(60):
-                        height = page.evaluate("() => document.scrollingElement.scrollHeight")
-                        if height == last:
+                        count = await pg.evaluate(HIG_LINK_COUNT_JS)
+                        if count == last:
                             same_count += 1
                         else:
                             same_count = 0
                         if same_count >= 2:
                             break
-                        page.evaluate("() => window.scrollBy(0, window.innerHeight)")
-                        page.wait_for_timeout(150)
-                        last = height
+                        await pg.evaluate("() => window.scrollBy(0, window.innerHeight)")
+                        await pg.wait_for_timeout(150)
+                        last = count
                     # Return to top for consistent DOM order reads
-                    page.evaluate("() => window.scrollTo(0, 0)")
-                    page.wait_for_timeout(100)
+                    await pg.evaluate("() => window.scrollTo(0, 0)")
+                    await pg.wait_for_timeout(100)
                 except Exception:
                     pass
 
-            # Helper to collect links from the current page by URL prefix, in DOM order
-            def collect_links_from_page(url_prefix: str):
+            # Helper to collect links from a loaded page by URL prefix, in DOM order
+            async def collect_links_from_page(pg, url_prefix: str):
                 # Ensure content is fully rendered
-                scroll_full_page()
-                links = page.query_selector_all('a[href^="/design/human-interface-guidelines/"]') or []
+                await scroll_full_page(pg)
+                links = await pg.eval_on_selector("body", LINKS_JS, "p.highlight, h2, h3, .card-title")
                 items = []
-                for a in links:
-                    href = a.get_attribute("href")
-                    if not href:
-                        continue
+                for link in links:
                     # Normalize to same-origin path
-                    if href.startswith("https://developer.apple.com"):
-                        href = href[len("https://developer.apple.com"):]
-                    elif href.startswith("http"):
-                        continue
-                    title_el = a.query_selector('p.highlight, h2, h3, .card-title') or a
-                    try:
-                        title = title_el.inner_text().strip()
-                    except Exception:
-                        title = (href.rstrip("/").split("/")[-1] or "").replace("-", " ").title()
-                    items.append({"href": href, "title": title})
+                    href = _normalize_href(link["href"]) if link["href"] else None
+                    if href:
+                        items.append({"href": href, "title": link["title"]})
                 return items
 
             # Traverse each top-level section page to capture full set of links
             def add_if_new(items):
                 for it in items:
-                    href = it["href"].split("#")[0]
-                    if href not in seen_hrefs and href.startswith("/design/human-interface-guidelines/"):
-                        seen_hrefs.add(href)
-                        discovered_links.append(it)
+                    href = it["href"]
+                    if href.startswith(HIG_PATH_PREFIX):
+                        discovered_links.setdefault(href, it)
 
             # Build per-section crawl
             for top_slug, top_name in slug_to_top.items():
                 section_url = urljoin(base_url, f"/design/human-interface-guidelines/{top_slug}/")
                 try:
-                    page.goto(section_url, wait_until="networkidle", timeout=60000)
+                    await page.goto(section_url, wait_until="domcontentloaded")
+                    await page.wait_for_selector("h1", timeout=10000)
                 except Exception:
                     continue
 
                 # On the section landing page, collect all internal links
                 prefix = f"/design/human-interface-guidelines/{top_slug}"
-                items = collect_links_from_page(prefix)
+                items = await collect_links_from_page(page, prefix)
                 add_if_new(items)
 
                 # Special: Components -> also visit each sub-section page to collect its articles
@@ -248,10 +437,10 @@ def get_article_urls():
                     # Identify sub-section links (depth == 4: /.../components/<sub>/)
                     sub_links = []
                     for it in items:
-                        parts = [p for p in it["href"].split("/") if p]
-                        if len(parts) >= 4 and parts[2] == "components":
+                        slugs = _path_slugs(it["href"])
+                        if slugs and slugs[0] == "components" and slugs[1]:
                             # keep unique sub-section hrefs (both overview and deeper will be revisited)
-                            sub_links.append(it["href"].split("#")[0].rstrip("/"))
+                            sub_links.append(it["href"])
                     sub_links = list(dict.fromkeys(sub_links))  # de-dup preserving order
 
                     # Ensure we also visit any known sub-sections, even if not linked on the landing page
@@ -260,17 +449,28 @@ def get_article_urls():
                         if candidate not in sub_links:
                             sub_links.append(candidate)
 
+                    # Only visit sub-section overview pages (exactly /components/<sub>)
+                    overview_hrefs = []
                     for sub_href in sub_links:
-                        # Only visit sub-section overview pages (exactly /components/<sub>)
-                        p = [p for p in sub_href.split("/") if p]
-                        if len(p) == 4 and p[2] == "components":
-                            sub_url = urljoin(base_url, sub_href + "/")
-                            try:
-                                page.goto(sub_url, wait_until="networkidle", timeout=60000)
-                                sub_items = collect_links_from_page(sub_href)
-                                add_if_new(sub_items)
-                            except Exception:
-                                pass
+                        slugs = _path_slugs(sub_href)
+                        if slugs and slugs[0] == "components" and slugs[1] and not slugs[2]:
+                            overview_hrefs.append(sub_href)
+
+                    # The overview pages are independent, so load them together,
+                    # each on its own page, and merge their links in list order
+                    async def fetch_sub_links(sub_href):
+                        sub_page = await context.new_page()
+                        try:
+                            await sub_page.goto(urljoin(base_url, sub_href + "/"), wait_until="domcontentloaded")
+                            await sub_page.wait_for_selector("h1", timeout=10000)
+                            return await collect_links_from_page(sub_page, sub_href)
+                        except Exception:
+                            return []
+                        finally:
+                            await sub_page.close()
+
+                    for sub_items in await asyncio.gather(*(fetch_sub_links(h) for h in overview_hrefs)):
+                        add_if_new(sub_items)
 
             # Classify links using page content (header/breadcrumb) with fallback slug mappings
             # Fallback mappings for root-level articles that belong to a top section (from your list)
@@ -337,24 +537,35 @@ def get_article_urls():
                 },
             }
 
-            from typing import Optional
+            # Reverse lookups, built once: article slug -> section / Components sub-section.
+            # setdefault keeps the first section listed for a slug, as the chained checks did.
+            root_slug_to_top = {}
+            for section_name, slugs in (
+                ("Getting Started", getting_started_slugs),
+                ("Foundations", foundations_slugs),
+                ("Patterns", patterns_slugs),
+                ("Inputs", inputs_slugs),
+                ("Technologies", technologies_slugs),
+            ):
+                for slug in slugs:
+                    root_slug_to_top.setdefault(slug, section_name)
+            comp_article_to_sub = {}
+            for comp_sub_name, slugs in components_articles_by_sub.items():
+                for slug in slugs:
+                    comp_article_to_sub.setdefault(slug, comp_sub_name)
+
             def map_root_slug_to_top(slug: str) -> Optional[str]:
-                if slug in getting_started_slugs:
-                    return "Getting Started"
-                if slug in foundations_slugs:
-                    return "Foundations"
-                if slug in patterns_slugs:
-                    return "Patterns"
-                if slug in inputs_slugs:
-                    return "Inputs"
-                if slug in technologies_slugs:
-                    return "Technologies"
-                return None
-            def extract_page_context_text() -> str:
+                return root_slug_to_top.get(slug)
+            async def detect_page_section(page):
+                """(top, sub) named in the page's breadcrumbs, eyebrows or headings.
+
+                The names are matched in the page, so only the result crosses
+                back over CDP; on failure the page title is matched instead.
+                """
                 try:
-                    ctx = page.evaluate(
+                    top, sub = await page.evaluate(
                         """
-                        () => {
+                        ([topNames, subNames]) => {
                             const texts = [];
                             const grab = (sel) => Array.from(document.querySelectorAll(sel)).forEach(el => {
                                 const t = (el.innerText || '').trim(); if (t) texts.push(t);
@@ -364,16 +575,24 @@ def get_article_urls():
                             grab('[class*="eyebrow" i], .eyebrow, .topic-eyebrow, .badge, .category, .section-eyebrow');
                             // Prominent headings
                             grab('main header h1, main header h2, main h1');
-                            return texts.join('\n').slice(0, 4000);
+                            const text = texts.join('\\n').slice(0, 4000).toLowerCase();
+                            const top = topNames.findIndex(name => text.includes(name));
+                            const sub = top === topNames.indexOf('components')
+                                ? subNames.findIndex(name => text.includes(name)) : -1;
+                            return [top, sub];
                         }
-                        """
+                        """,
+                        [[n.lower() for n in TOP_LEVEL_ORDER], [n.lower() for n in COMPONENTS_ORDER]],
+                    )
+                    return (
+                        TOP_LEVEL_ORDER[top] if top >= 0 else None,
+                        COMPONENTS_ORDER[sub] if sub >= 0 else None,
                     )
-                    return (ctx or '').lower()
                 except Exception:
                     try:
-                        return (page.title() or '').lower()
+                        return detect_top_and_sub((await page.title() or '').lower())
                     except Exception:
-                        return ''
+                        return None, None
 
             def detect_top_and_sub(text_lower: str):
                 top = None
@@ -389,75 +608,113 @@ def get_article_urls():
                             break
                 return top, sub
 
-            # Visit each discovered link and classify it
-            seen_urls_for_classification = set()
-            for item in discovered_links:
-                href = item["href"].split("#")[0]
-                title = item["title"]
-                full_url = urljoin(base_url, href)
-                if full_url in seen_urls_for_classification:
-                    continue
-                seen_urls_for_classification.add(full_url)
-
-                parts = [p for p in href.split("/") if p]
-                if len(parts) < 3 or parts[0] != "design" or parts[1] != "human-interface-guidelines":
-                    continue
-                # Remove any repeated 'human-interface-guidelines'
-                i = 2
-                while i < len(parts) and parts[i] == "human-interface-guidelines":
-                    parts.pop(i)
-                if len(parts) < 3:
-                    continue
-
+            def infer_from_path(slugs):
+                """(top, sub) when the URL path alone places the article, else (None, None)."""
+                slug, sub_slug, leaf = slugs
+                if slug in slug_to_top and sub_slug:
+                    if slug != "components":
+                        return slug_to_top[slug], None
+                    # /components/<sub>/<article> names its sub-section, even
+                    # one missing from comp_slug_to_name
+                    if leaf:
+                        return "Components", comp_slug_to_name.get(sub_slug, sub_slug.replace("-", " ").title())
+                    return None, None
+                if slug in comp_article_to_sub:
+                    return "Components", comp_article_to_sub[slug]
+                return map_root_slug_to_top(slug), None
+
+            def should_classify(slugs):
+                """False for the HIG root and section or sub-section overview pages."""
+                if not slugs:
+                    return False
+                slug, sub_slug, leaf = slugs
                 # Skip top-level overview pages
-                if parts[2] in slug_to_top and len(parts) == 3:
-                    continue
+                if slug in slug_to_top and not sub_slug:
+                    return False
                 # Skip component sub-section overview pages
-                if parts[2] == "components" and len(parts) == 4:
-                    continue
-
-                # Load page quickly for classification
-                try:
-                    page.goto(full_url, wait_until="domcontentloaded", timeout=30000)
-                except Exception:
-                    pass
-                ctx_text = extract_page_context_text()
-                top_name, sub_name = detect_top_and_sub(ctx_text)
+                if slug == "components" and sub_slug and not leaf:
+                    return False
+                return True
+
+            # Select the article links to classify, in discovery order;
+            # discovered_links holds canonical site paths, unique across the run,
+            # so the full URL is a plain concatenation
+            to_classify = [
+                (_path_slugs(item["href"]), item) for item in discovered_links.values()
+            ]
+            # (slugs, title, full_url, top and sub-section from the path)
+            candidates = [
+                (slugs, item["title"], base_url + item["href"], infer_from_path(slugs))
+                for slugs, item in to_classify
+                if should_classify(slugs)
+            ]
+
+            # Only articles the path does not place are looked up, concurrently:
+            # their DocC JSON first, else a page of their own in the context
+            semaphore = asyncio.Semaphore(CLASSIFY_CONCURRENCY)
+
+            def section_from_docc(data):
+                """(top, sub) from the ancestor titles in a DocC JSON document."""
+                refs = data.get("references") or {}
+                titles = [
+                    (refs.get(ref) or {}).get("title")
+                    for path in (data.get("hierarchy") or {}).get("paths") or []
+                    for ref in path
+                ]
+                top = next((t for t in titles if t in TOP_LEVEL_ORDER), None)
+                sub = next((t for t in titles if t in COMPONENTS_ORDER), None) if top == "Components" else None
+                return top, sub
 
+            async def fetch_page_section(idx, full_url):
+                if idx < CLASSIFY_CONCURRENCY:
+                    await asyncio.sleep(idx * CLASSIFY_STAGGER_S)
+                async with semaphore:
+                    # The page's DocC JSON names its ancestors without a render
+                    try:
+                        resp = await context.request.get(docc_data_url(full_url), timeout=20000)
+                        if resp.ok:
+                            detected = section_from_docc(await resp.json())
+                            if detected[0]:
+                                return detected
+                    except Exception:
+                        pass
+                    # Missing document or unexpected schema: render the page
+                    article_page = await context.new_page()
+                    try:
+                        try:
+                            await article_page.goto(full_url, wait_until="domcontentloaded")
+                            # The header text is rendered client-side after DOMContentLoaded
+                            await article_page.wait_for_selector("main h1", timeout=10000)
+                        except Exception:
+                            pass
+                        return await detect_page_section(article_page)
+                    finally:
+                        await article_page.close()
+
+            def place_article(slugs, title, full_url, top_name, sub_name):
+                slug, sub_slug, _ = slugs
                 # Fallbacks
                 if not top_name:
-                    slug = parts[2]
-                    if slug in slug_to_top and len(parts) >= 4:
+                    if slug in slug_to_top and sub_slug:
                         top_name = slug_to_top[slug]
+                    # First, check if it's a flat Components article
+                    elif slug in comp_article_to_sub:
+                        top_name = "Components"
                     else:
-                        # First, check if it's a flat Components article
-                        comp_sub = None
-                        for sub_name_cand, slugs in components_articles_by_sub.items():
-                            if slug in slugs:
-                                top_name = "Components"
-                                comp_sub = sub_name_cand
-                                break
-                        if not top_name:
-                            mapped = map_root_slug_to_top(slug)
-                            if mapped:
-                                top_name = mapped
+                        top_name = map_root_slug_to_top(slug)
 
                 if not top_name:
                     # Could not classify
-                    continue
+                    return
 
                 if top_name == "Components":
                     # Prefer sub_name from content; else infer from path or flat mapping
                     if not sub_name:
-                        if len(parts) >= 4 and parts[2] == "components":
-                            sub_slug = parts[3]
+                        if slug == "components" and sub_slug:
                             sub_name = comp_slug_to_name.get(sub_slug, sub_slug.replace("-", " ").title())
                         else:
                             # from flat mapping if available
-                            for sub_name_cand, slugs in components_articles_by_sub.items():
-                                if parts[2] in slugs:
-                                    sub_name = sub_name_cand
-                                    break
+                            sub_name = comp_article_to_sub.get(slug)
                     if sub_name:
                         add_sub_article(top_name, sub_name, title, full_url)
                     else:
@@ -466,6 +723,53 @@ def get_article_urls():
                 else:
                     add_article(top_name, title, full_url)
 
+            # Pages classified on an earlier run are not loaded again
+            classifications = {} if force_refresh else _load_classifications()
+            # Results are placed by a single consumer while pages are still loading.
+            # It places them in discovery order, holding back any that finish early.
+            results = asyncio.Queue()
+            fetches = []
+            for idx, (_, _, full_url, (path_top, path_sub)) in enumerate(candidates):
+                if path_top:
+                    results.put_nowait((idx, (path_top, path_sub)))
+                elif full_url in classifications:
+                    results.put_nowait((idx, classifications[full_url]))
+                else:
+                    fetches.append((idx, full_url))
+            # Load sibling articles back to back so their requests share
+            # connections and CDN edge caches; placement order is unaffected
+            fetches.sort(key=lambda f: f[1])
+            logger.info(f"Classifying {len(candidates)} articles ({len(fetches)} need their page loaded)...")
+
+            async def fetch_and_report(order, idx, full_url):
+                try:
+                    detected = await fetch_page_section(order, full_url)
+                except Exception:
+                    # Still report it, or the consumer would wait for it forever
+                    detected = (None, None)
+                # An empty result may just be a page that failed to load
+                if detected[0]:
+                    classifications[full_url] = detected
+                await results.put((idx, detected))
+
+            async def place_in_order():
+                held = {}
+                next_idx = 0
+                while next_idx < len(candidates):
+                    idx, detected = await results.get()
+                    held[idx] = detected
+                    while next_idx in held:
+                        slugs, title, full_url, _ = candidates[next_idx]
+                        place_article(slugs, title, full_url, *held.pop(next_idx))
+                        next_idx += 1
+
+            await asyncio.gather(
+                place_in_order(),
+                *(fetch_and_report(order, idx, url) for order, (idx, url) in enumerate(fetches)),
+            )
+            if fetches:
+                _save_classifications(classifications)
+
             # Convert section map to ordered list
             sections = []
 
@@ -507,33 +811,33 @@ def get_article_urls():
                     })
 
         except Exception as e:
-            print(f"An error occurred during URL discovery: {str(e)}")
+            logger.error(f"An error occurred during URL discovery: {str(e)}")
             sections = []
-        finally:
-            browser.close()
 
     # Basic stats
     total_articles = sum(len(s.get("articles", [])) + sum(len(ss.get("articles", [])) for ss in s.get("sub_sections", [])) for s in sections)
-    print(f"\nDiscovered {len(sections)} sections.")
-    print(f"Found {total_articles} articles across {len(sections)} sections.")
+    logger.info(f"\nDiscovered {len(sections)} sections.")
+    logger.info(f"Found {total_articles} articles across {len(sections)} sections.")
 
-    # Print concise discovery summary with counts and sample URLs
-    if sections:
-        print("\nDiscovery summary:")
+    # Log a concise discovery summary with counts and sample URLs, built only
+    # when it will be shown and emitted as one record
+    if sections and logger.isEnabledFor(logging.INFO):
+        lines = ["", "Discovery summary:"]
         for section in sections:
             root_count = len(section.get("articles", []))
             sub_sections = section.get("sub_sections", [])
             sub_total = sum(len(ss.get("articles", [])) for ss in sub_sections)
-            print(f"- {section['title']}: {root_count + sub_total} articles (root: {root_count}, sub-sections: {len(sub_sections)})")
+            lines.append(f"- {section['title']}: {root_count + sub_total} articles (root: {root_count}, sub-sections: {len(sub_sections)})")
 
             # Root article samples
             if root_count:
                 root_samples = ", ".join(a.get("url", "") for a in section["articles"][:2])
-                print(f"  root samples: {root_samples}")
+                lines.append(f"  root samples: {root_samples}")
 
             # Sub-section counts and samples
             for ss in sub_sections:
                 ss_count = len(ss.get("articles", []))
                 ss_samples = ", ".join(a.get("url", "") for a in ss.get("articles", [])[:2])
-                print(f"  - {ss['title']}: {ss_count} articles; samples: {ss_samples}")
+                lines.append(f"  - {ss['title']}: {ss_count} articles; samples: {ss_samples}")
+        logger.info("\n".join(lines))
     return sections
@@ -1,52 +1,192 @@
-import os
+import io
 import re
-import time
 import hashlib
-from datetime import datetime
-from PyPDF2 import PdfReader
-
-def sanitize_filename(text):
-    """Create safe filenames from titles"""
-    return re.sub(r'[\\/*?:"<>|]', '', text)[:100].strip()
-
-def get_unique_filename(output_dir, base_name):
-    """Create a unique filename using timestamp and hash if needed."""
-    base, ext = os.path.splitext(base_name)
-    timestamp = int(time.time() * 1000)
-    counter = 0
-    
-    while True:
-        if counter == 0:
-            filename = f"{base}_{timestamp}{ext}"
-        else:
-            filename = f"{base}_{timestamp}_{counter}{ext}"
-            
-        filepath = os.path.join(output_dir, filename)
-        if not os.path.exists(filepath):
-            return filepath
-        counter += 1
-
-def calculate_content_hash(page):
-    """Calculate hash of page content for duplicate detection"""
-    content = page.evaluate("""() => {
+from functools import partial
+from string import Template
+from urllib.parse import urlsplit
+import pikepdf
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Content hashes only detect duplicates, so the fastest available
+# non-cryptographic hash is used; 128-bit BLAKE2b is the stdlib fallback
+try:
+    import xxhash
+    _new_hasher = xxhash.xxh3_128
+except ImportError:
+    _new_hasher = partial(hashlib.blake2b, digest_size=16)
+
+# Page text is returned to Python in slices of this many UTF-16 code units
+HASH_CHUNK_CHARS = 64 * 1024
+
+# One keep-alive session for plain HTTP fetches, shared by all workers so TLS
+# connections are reused
+HTTP_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3))
+HTTP_SESSION.mount('https://', _ADAPTER)
+HTTP_SESSION.mount('http://', _ADAPTER)
+
+def docc_data_url(url):
+    """URL of the DocC JSON document the HIG web app renders for ``url``."""
+    u = urlsplit(url)
+    return f"{u.scheme}://{u.netloc}/tutorials/data{u.path.rstrip('/')}.json"
+
+def fast_hash(text):
+    """Hex digest of ``text`` for de-duplication, not for security."""
+    return _new_hasher(text.encode('utf-8')).hexdigest()
+
+async def calculate_content_hash(page):
+    """Calculate hash of page content for duplicate detection.
+
+    The text comes back in slices that are hashed one at a time, so no
+    encoded copy of the whole page is held; the digest equals fast_hash()
+    of the full text.
+    """
+    chunks = await page.evaluate("""(size) => {
         const main = document.querySelector('main') || document.body;
         const clone = main.cloneNode(true);
         const dynamics = clone.querySelectorAll('[data-dynamic], .timestamp, time');
         dynamics.forEach(el => el.remove());
-        return clone.textContent;
-    }""")
-    return hashlib.md5(content.encode()).hexdigest()
+        const text = clone.textContent;
+        const chunks = [];
+        for (let i = 0; i < text.length;) {
+            let end = Math.min(i + size, text.length);
+            // Never split a surrogate pair across slices
+            const last = text.charCodeAt(end - 1);
+            if (end < text.length && last >= 0xD800 && last <= 0xDBFF) end--;
+            chunks.push(text.slice(i, end));
+            i = end;
+        }
+        return chunks;
+    }""", HASH_CHUNK_CHARS)
+    hasher = _new_hasher()
+    for chunk in chunks:
+        hasher.update(chunk.encode('utf-8'))
+    return hasher.hexdigest()
+
+def get_pdf_page_count(pdf_bytes):
+    """Get the number of pages in an in-memory PDF.
 
-def get_pdf_page_count(pdf_path):
-    """Get the number of pages in a PDF file"""
+    Called once per rendered PDF; the count is carried alongside the bytes so
+    nothing downstream has to parse the document again to learn it.
+    """
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            return len(reader.pages)
+        with pikepdf.Pdf.open(io.BytesIO(pdf_bytes)) as pdf:
+            return len(pdf.pages)
     except Exception as e:
-        print(f"Error getting page count for {pdf_path}: {str(e)}")
+        print(f"Error getting page count: {str(e)}")
         return 0
 
+_WHITESPACE = re.compile(r'\s+')
+_CSS_PUNCT_SPACE = re.compile(r'\s*([{}:;,])\s*')
+
+def _minify_css(css):
+    """Collapse whitespace in a stylesheet, including around punctuation."""
+    return _CSS_PUNCT_SPACE.sub(r'\1', _WHITESPACE.sub(' ', css)).strip()
+
+# Stylesheets are kept readable here and minified once at import
+_INDEX_CSS = _minify_css("""
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, "SF Pro Text", "SF Pro Icons", sans-serif;
+        padding: 48px;
+        max-width: 980px;
+        margin: 0 auto;
+        color: #1d1d1f;
+    }
+    h1 {
+        font-size: 40px;
+        font-weight: 600;
+        letter-spacing: -0.003em;
+        margin-bottom: 40px;
+    }
+    ul {
+        list-style: none;
+        padding: 0;
+        margin: 0;
+    }
+    li {
+        border-bottom: 1px solid #d2d2d7;
+    }
+    li.section-title {
+        font-size: 24px;
+        font-weight: 600;
+        padding-top: 24px;
+        padding-bottom: 8px;
+        border-bottom: none;
+    }
+    .sub-section {
+        padding-left: 20px;
+        border-top: 1px solid #d2d2d7;
+        margin-top: 8px;
+    }
+    .sub-section-title {
+        font-size: 19px;
+        font-weight: 500;
+        padding-top: 16px;
+        padding-bottom: 8px;
+        border-bottom: none;
+    }
+    a {
+        text-decoration: none;
+        color: inherit;
+        padding: 12px 0;
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+    }
+    a:hover { color: #06c; }
+    .title { font-size: 17px; letter-spacing: -0.022em; }
+    .page { color: #86868b; font-size: 15px; font-weight: 400; }
+
+""")
+
+_COVER_CSS = _minify_css("""
+    body {
+        margin: 0;
+        padding: 40px;
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        min-height: 100vh;
+        font-family: -apple-system, BlinkMacSystemFont, sans-serif;
+    }
+    .cover { text-align: center; max-width: 800px; }
+    h1 {
+        font-size: 48px;
+        font-weight: 500;
+        margin: 0 0 2rem;
+        color: #1d1d1f;
+    }
+    .subtitle {
+        font-size: 24px;
+        font-weight: 300;
+        color: #86868b;
+        margin: 0;
+    }
+
+""")
+
+# Static shell of the index page; only the list items are filled in per call.
+# A Template keeps the CSS braces single.
+_INDEX_SHELL = Template(
+    '<html><head><style>' + _INDEX_CSS + '</style></head>'
+    '<body><h1>Contents</h1><ul>$items</ul></body></html>'
+)
+
+# The cover page has no variable parts
+_COVER_HTML = (
+    '<!DOCTYPE html><html><head><style>' + _COVER_CSS + '</style></head>'
+    '<body><div class="cover"><h1>Human Interface Guidelines</h1>'
+    '<p class="subtitle">A comprehensive guide for designing<br>intuitive user experiences</p>'
+    '</div></body></html>'
+)
+
+# Bound str.format methods for the index rows
+_SECTION_ROW = '<li class="section-title">{}</li>'.format
+_SUB_SECTION_ROW = '<li class="sub-section-title">{}</li>'.format
+_ARTICLE_ROW = '<li><a href="#"><span class="title">{}</span><span class="page">{}</span></a></li>'.format
+
 def create_index_html(sections, generated_files_map, cover_page_count):
     """Create index page HTML preserving the given order for sections and sub-sections.
 
@@ -54,161 +194,54 @@ def create_index_html(sections, generated_files_map, cover_page_count):
     assign page numbers in the same order the content will be merged.
     """
 
-    # Start after the cover
-    current_page = cover_page_count
+    # Flatten once into (heading markup, articles, closing markup) groups in
+    # merge order; empty groups are kept so every heading is still rendered.
+    # Articles are counted on the way for the index length estimate.
+    groups = []
+    total_articles = 0
+    for section in sections:
+        articles = section.get("articles", [])
+        total_articles += len(articles)
+        groups.append((_SECTION_ROW(section["title"]), articles, ""))
+        sub_sections = section.get("sub_sections", [])
+        for i, sub_section in enumerate(sub_sections):
+            heading = _SUB_SECTION_ROW(sub_section["title"])
+            if i == 0:
+                heading = '<ul class="sub-section">' + heading
+            closing = '</ul>' if i == len(sub_sections) - 1 else ""
+            articles = sub_section.get("articles", [])
+            total_articles += len(articles)
+            groups.append((heading, articles, closing))
 
-    # Estimate index length to offset article page numbers correctly
-    total_articles = sum(
-        len(s.get("articles", [])) + sum(len(ss.get("articles", [])) for ss in s.get("sub_sections", []))
-        for s in sections
-    )
+    # Article pages start after the cover and the estimated index length
     estimated_index_pages = max(1, (total_articles // 45) + 1)
-    current_page += estimated_index_pages
+    current_page = cover_page_count + estimated_index_pages
 
     # Assign page numbers in merge order
     processed_urls = set()
-    for section in sections:
-        for article in section.get("articles", []):
-            if article["url"] in processed_urls:
+    mark_processed = processed_urls.add
+    for _, articles, _ in groups:
+        for article in articles:
+            url = article["url"]
+            if url in processed_urls:
                 continue
-            filepath, page_count = generated_files_map.get(article["url"], (None, 0))
-            if filepath:
+            pdf_bytes, page_count = generated_files_map.get(url, (None, 0))
+            if pdf_bytes:
                 article["page_num"] = current_page
                 current_page += page_count
-                processed_urls.add(article["url"])
-        for sub_section in section.get("sub_sections", []):
-            for article in sub_section.get("articles", []):
-                if article["url"] in processed_urls:
-                    continue
-                filepath, page_count = generated_files_map.get(article["url"], (None, 0))
-                if filepath:
-                    article["page_num"] = current_page
-                    current_page += page_count
-                    processed_urls.add(article["url"])
-
-    # Generate HTML (preserve order; no alphabetical sorting)
-    items_html = ""
-    for section in sections:
-        items_html += f'<li class="section-title">{section["title"]}</li>'
-
-        for article in section.get("articles", []):
-            items_html += (
-                f'<li><a href="#"><span class="title">{article["title"]}</span>'
-                f'<span class="page">{article.get("page_num", "")}</span></a></li>'
-            )
-
-        if section.get("sub_sections"):
-            items_html += '<ul class="sub-section">'
-            for sub_section in section["sub_sections"]:
-                items_html += f'<li class="sub-section-title">{sub_section["title"]}</li>'
-                for article in sub_section["articles"]:
-                    items_html += (
-                        f'<li><a href="#"><span class="title">{article["title"]}</span>'
-                        f'<span class="page">{article.get("page_num", "")}</span></a></li>'
-                    )
-            items_html += '</ul>'
-
-    html = f"""
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, "SF Pro Text", "SF Pro Icons", sans-serif;
-                    padding: 48px;
-                    max-width: 980px;
-                    margin: 0 auto;
-                    color: #1d1d1f;
-                }}
-                h1 {{
-                    font-size: 40px;
-                    font-weight: 600;
-                    letter-spacing: -0.003em;
-                    margin-bottom: 40px;
-                }}
-                ul {{
-                    list-style: none;
-                    padding: 0;
-                    margin: 0;
-                }}
-                li {{
-                    border-bottom: 1px solid #d2d2d7;
-                }}
-                li.section-title {{
-                    font-size: 24px;
-                    font-weight: 600;
-                    padding-top: 24px;
-                    padding-bottom: 8px;
-                    border-bottom: none;
-                }}
-                .sub-section {{
-                    padding-left: 20px;
-                    border-top: 1px solid #d2d2d7;
-                    margin-top: 8px;
-                }}
-                .sub-section-title {{
-                    font-size: 19px;
-                    font-weight: 500;
-                    padding-top: 16px;
-                    padding-bottom: 8px;
-                    border-bottom: none;
-                }}
-                a {{
-                    text-decoration: none;
-                    color: inherit;
-                    padding: 12px 0;
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                }}
-                a:hover {{ color: #06c; }}
-                .title {{ font-size: 17px; letter-spacing: -0.022em; }}
-                .page {{ color: #86868b; font-size: 15px; font-weight: 400; }}
-            </style>
-        </head>
-        <body>
-            <h1>Contents</h1>
-            <ul>{items_html}</ul>
-        </body>
-        </html>
-    """
-    return html, sections
+                mark_processed(url)
+
+    # Generate HTML from the same groups (preserve order; no alphabetical sorting)
+    parts = []
+    for heading, articles, closing in groups:
+        parts.append(heading)
+        for article in articles:
+            parts.append(_ARTICLE_ROW(article["title"], article.get("page_num", "")))
+        parts.append(closing)
+    items_html = ''.join(parts)
+
+    return _INDEX_SHELL.substitute(items=items_html), sections
 
 def create_cover_html():
     """Create a minimalist cover page"""
-    return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    margin: 0;
-                    padding: 40px;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    min-height: 100vh;
-                    font-family: -apple-system, BlinkMacSystemFont, sans-serif;
-                }}
-                .cover {{ text-align: center; max-width: 800px; }}
-                h1 {{
-                    font-size: 48px;
-                    font-weight: 500;
-                    margin: 0 0 2rem;
-                    color: #1d1d1f;
-                }}
-                .subtitle {{
-                    font-size: 24px;
-                    font-weight: 300;
-                    color: #86868b;
-                    margin: 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="cover">
-                <h1>Human Interface Guidelines</h1>
-                <p class="subtitle">A comprehensive guide for designing<br>intuitive user experiences</p>
-            </div>
-        </body>
-        </html>
-    """
+    return _COVER_HTML